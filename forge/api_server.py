@@ -6,38 +6,95 @@ Run this server and point the frontend to it.
 Usage:
     python api_server.py
 
+    or, to pick the worker count/event loop explicitly:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000 --workers 4 --loop uvloop
+
 Then the frontend can call: http://localhost:8000/api/fetch-grokipedia?url=<grokipedia-url>
 """
-from flask import Flask, request, jsonify
-try:
-    from flask_cors import CORS
-    cors_available = True
-except ImportError:
-    cors_available = False
-    print("Warning: flask_cors not available. CORS may not work properly.")
-    print("Install with: pip install flask-cors")
-
-from grokipedia_crawler import fetch_grokipedia_article
-import sys
-
-app = Flask(__name__)
-if cors_available:
-    CORS(app)  # Enable CORS for all routes
-else:
-    # Manual CORS headers
-    @app.after_request
-    def after_request(response):
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-        return response
-
-@app.route('/api/fetch-grokipedia', methods=['GET'])
-def fetch_grokipedia():
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from grokipedia_crawler import REQUEST_HEADERS, parse_grokipedia_article
+
+# One pooled client per worker so Grokipedia connections are reused across requests
+client = httpx.AsyncClient(
+    headers=REQUEST_HEADERS,
+    timeout=30,
+    http2=True,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=100)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await client.aclose()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_headers=['Content-Type', 'Authorization'],
+    allow_methods=['GET', 'PUT', 'POST', 'DELETE', 'OPTIONS']
+)
+
+async def fetch_grokipedia_article(url: str) -> Optional[Dict]:
+    """Fetch and extract a Grokipedia article without blocking the event loop"""
+    try:
+        response = await client.get(url)
+        # A missing page is an expected miss (e.g. probing topic URL variants), not an error
+        if response.status_code in (404, 410):
+            return None
+        response.raise_for_status()
+        # RSC payloads can run to several MB; parse off the event loop so other requests keep flowing
+        return await asyncio.to_thread(parse_grokipedia_article, response.text, url)
+    except Exception as e:
+        print(f"Error fetching Grokipedia article: {e}")
+        return None
+
+async def _first_article(urls: List[str]) -> Optional[Dict]:
+    """Return the earliest variant in `urls` with content, fetching all of them concurrently"""
+    tasks = [asyncio.create_task(fetch_grokipedia_article(url)) for url in urls]
+    try:
+        # Results are checked in list order so a higher-priority variant wins regardless of timing
+        for task in tasks:
+            result = await task
+            if result and result.get('content'):
+                return result
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _article_response(result: Dict) -> Dict:
+    """Shape a crawler result into the proxy's success payload"""
+    return {
+        'success': True,
+        'title': result['title'],
+        'content': result['content'],
+        'url': result['url'],
+        'citations': result['citations'],
+        'word_count': result.get('word_count', 0),
+        'citation_count': result.get('citation_count', 0)
+    }
+
+def _json(data: Dict, status_code: int = 200) -> Response:
+    """Serialize a payload with orjson, bypassing FastAPI's jsonable_encoder pass"""
+    return Response(orjson.dumps(data), status_code=status_code, media_type='application/json')
+
+def _error_response(message: str, status_code: int) -> Response:
+    """Error payload in the {'error': ...} shape the frontend expects"""
+    return _json({'error': message}, status_code)
+
+@app.get('/api/fetch-grokipedia')
+async def fetch_grokipedia(url: Optional[str] = None, topic: Optional[str] = None):
     """Proxy endpoint to fetch Grokipedia articles by URL or topic"""
-    url = request.args.get('url')
-    topic = request.args.get('topic')
-    
     # If topic provided, try to convert to URL
     if topic and not url:
         # Convert topic to potential Grokipedia URL
@@ -48,56 +105,37 @@ def fetch_grokipedia():
             f"https://grokipedia.com/article/{cleaned}",
         ]
         
-        # Try each variant
-        for potential_url in url_variants:
-            try:
-                result = fetch_grokipedia_article(potential_url)
-                if result and result.get('content'):
-                    return jsonify({
-                        'success': True,
-                        'title': result['title'],
-                        'content': result['content'],
-                        'url': result['url'],
-                        'citations': result['citations'],
-                        'word_count': result.get('word_count', 0),
-                        'citation_count': result.get('citation_count', 0)
-                    })
-            except:
-                continue
+        # Probe all variants concurrently and answer with the highest-priority hit
+        result = await _first_article(url_variants)
+        if result:
+            return _json(_article_response(result))
         
-        return jsonify({'error': f'No Grokipedia article found for topic: {topic}'}), 404
+        return _error_response(f'No Grokipedia article found for topic: {topic}', 404)
     
     if not url:
-        return jsonify({'error': 'Missing url or topic parameter'}), 400
+        return _error_response('Missing url or topic parameter', 400)
     
     if 'grokipedia.com' not in url.lower():
-        return jsonify({'error': 'URL must be from grokipedia.com'}), 400
+        return _error_response('URL must be from grokipedia.com', 400)
     
     try:
-        result = fetch_grokipedia_article(url)
+        result = await fetch_grokipedia_article(url)
         
         if result:
-            return jsonify({
-                'success': True,
-                'title': result['title'],
-                'content': result['content'],
-                'url': result['url'],
-                'citations': result['citations'],
-                'word_count': result.get('word_count', 0),
-                'citation_count': result.get('citation_count', 0)
-            })
+            return _json(_article_response(result))
         else:
-            return jsonify({'error': 'Failed to extract article content'}), 500
-            
+            return _error_response('Failed to extract article content', 500)
+    
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(str(e), 500)
 
-@app.route('/health', methods=['GET'])
-def health():
+@app.get('/health')
+async def health():
     """Health check endpoint"""
-    return jsonify({'status': 'ok'})
+    return _json({'status': 'ok'})
 
 if __name__ == '__main__':
+    import uvicorn
     print("Starting Grokipedia API server on http://localhost:8000")
     print("Frontend can use: http://localhost:8000/api/fetch-grokipedia?url=<grokipedia-url>")
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    uvicorn.run('api_server:app', host='0.0.0.0', port=8000, workers=4)
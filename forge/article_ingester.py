@@ -1,54 +1,134 @@
 """Article ingestion module for extracting GrokiPedia articles and citations"""
+import hashlib
+import json
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+from lxml.html import soupparser
 from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 import re
 import config
 import utils
 from grokipedia_crawler import fetch_grokipedia_article
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+# Elements that never carry article text or citations
+_NON_CONTENT_TAGS = ("script", "style", "nav", "footer", "header")
+
+# CSS selectors compiled to XPath once, tried in order of preference
+_TITLE_SELECTORS = [CSSSelector(s, translator='html') for s in (
+    'h1.article-title',
+    'h1',
+    '.title',
+    'title'
+)]
+_CONTENT_SELECTORS = [CSSSelector(s, translator='html') for s in (
+    '.article-content',
+    '.main-content',
+    'article',
+    '.content',
+    'main'
+)]
+_DATE_SELECTORS = [CSSSelector(s, translator='html') for s in (
+    '.last-modified',
+    '.date',
+    'time',
+    '[datetime]'
+)]
+_AUTHOR_SELECTORS = [CSSSelector(s, translator='html') for s in (
+    '.author',
+    '.byline',
+    '[rel="author"]'
+)]
+
+
+@lru_cache(maxsize=None)
+def _internal_hosts() -> frozenset:
+    """Hosts whose links are internal GrokiPedia navigation, not citations (read from config on first use)"""
+    host = urlsplit(config.GROKIPEDIA_BASE_URL).hostname
+    if host.startswith("www."):
+        host = host[4:]
+    return frozenset({host, "www." + host})
+
+
+# Shared keep-alive pool so repeat fetches skip the TCP/TLS handshake
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'CitationGraphAuditor/1.0'
+})
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
 
 
 class ArticleIngester:
     """Extract article content, citations, and metadata from GrokiPedia"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'CitationGraphAuditor/1.0'
-        })
+        self.session = _SESSION
+        self.cache = None
+        if REDIS_AVAILABLE and config.REDIS_URL:
+            self.cache = redis.Redis.from_url(config.REDIS_URL)
     
     def fetch_article(self, url: str) -> Optional[Dict]:
-        """Fetch article from GrokiPedia URL"""
+        """Fetch article from GrokiPedia URL, using the Redis cache when enabled"""
+        cache_key = "art:" + hashlib.sha256(url.encode()).hexdigest()
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = self._fetch_article(url)
+        if result:
+            self._cache_set(cache_key, result)
+        return result
+    
+    def _fetch_article(self, url: str) -> Optional[Dict]:
+        """Fetch and parse an article, bypassing the cache"""
         # Check if it's a Grokipedia.com URL - use the crawler
         if "grokipedia.com" in url.lower():
             try:
                 result = fetch_grokipedia_article(url)
                 if result:
                     # Process citations with our utility functions
-                    processed_citations = []
-                    for cit in result.get("citations", []):
-                        processed_citations.append({
-                            "url": cit["url"],
-                            "text": cit.get("text", cit["url"]),
-                            "type": cit.get("type", "markdown"),
-                            "source_type": utils.classify_source_type(cit["url"]),
-                            "domain": utils.normalize_domain(cit["url"]),
-                            "reliability": utils.calculate_reliability_score(
-                                cit["url"],
-                                utils.classify_source_type(cit["url"])
-                            )
-                        })
+                    processed_citations = [
+                        self._build_citation(
+                            cit["url"],
+                            cit.get("text", cit["url"]),
+                            cit.get("type", "markdown")
+                        )
+                        for cit in result.get("citations", [])
+                    ]
                     
                     result["citations"] = processed_citations
                     result["citation_count"] = len(processed_citations)
                     
                     # Also extract citations from the markdown content itself
-                    additional_citations = utils.extract_citations_from_text(result["content"])
-                    seen_urls = {c["url"] for c in processed_citations}
-                    for cit in additional_citations:
-                        if cit["url"] not in seen_urls:
-                            processed_citations.append(cit)
-                            seen_urls.add(cit["url"])
+                    seen_urls = {self._citation_key(c.url) for c in processed_citations}
+                    for cit in utils.iter_citations_from_text(result["content"]):
+                        key = self._citation_key(cit["url"])
+                        if key not in seen_urls:
+                            processed_citations.append(self._build_citation(
+                                cit["url"],
+                                cit.get("text", cit["url"]),
+                                cit.get("type", "markdown")
+                            ))
+                            seen_urls.add(key)
                     
                     result["citations"] = processed_citations
                     result["citation_count"] = len(processed_citations)
@@ -61,13 +141,49 @@ class ArticleIngester:
         
         # Fallback to regular HTML parsing
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return self._parse_article(response.text, url)
+            root = self._fetch_tree(url)
+            return self._parse_tree(root, url)
         except Exception as e:
             print(f"Error fetching article: {e}")
             return None
     
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        """Return a cached article, or None on a miss or cache error"""
+        if self.cache is None:
+            return None
+        try:
+            data = self.cache.get(key)
+        except redis.RedisError as e:
+            print(f"Article cache unavailable: {e}")
+            return None
+        if not data:
+            return None
+        article = json.loads(data)
+        article["citations"] = [utils.Citation(**c) for c in article.get("citations", [])]
+        return article
+    
+    def _cache_set(self, key: str, article: Dict):
+        """Store a parsed article with a TTL based on its freshness"""
+        if self.cache is None:
+            return
+        try:
+            self.cache.setex(key, self._cache_ttl(article), json.dumps(article, default=asdict))
+        except redis.RedisError as e:
+            print(f"Article cache unavailable: {e}")
+    
+    def _cache_ttl(self, article: Dict) -> int:
+        """Pick a cache TTL tier from the article's last-modified date"""
+        last_modified = (article.get("metadata") or {}).get("last_modified")
+        try:
+            modified = datetime.fromisoformat(last_modified)
+        except (TypeError, ValueError):
+            return config.ARTICLE_CACHE_TTL["normal"]
+        
+        now = datetime.now(timezone.utc) if modified.tzinfo else datetime.now()
+        if now - modified < timedelta(days=1):
+            return config.ARTICLE_CACHE_TTL["short"]
+        return config.ARTICLE_CACHE_TTL["long"]
+    
     def fetch_by_topic(self, topic: str) -> Optional[Dict]:
         """Fetch article by topic name (searches GrokiPedia)"""
         # For MVP, assume topic maps to URL pattern
@@ -75,21 +191,49 @@ class ArticleIngester:
         url = f"{config.GROKIPEDIA_BASE_URL}/article/{topic.replace(' ', '_')}"
         return self.fetch_article(url)
     
+    def _fetch_tree(self, url: str):
+        """Fetch a page and parse it incrementally while the body streams in"""
+        with self.session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            # Only trust an explicit charset; otherwise lxml sniffs <meta charset>
+            content_type = response.headers.get('Content-Type', '')
+            encoding = response.encoding if 'charset' in content_type else None
+            parser = lxml_html.HTMLParser(encoding=encoding)
+            for chunk in response.iter_content(chunk_size=65536):
+                parser.feed(chunk)
+        
+        try:
+            root = parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        if root is None:
+            # Nothing parseable was received (e.g. an empty body)
+            root = soupparser.fromstring("")
+        return root
+    
     def _parse_article(self, html: str, url: str) -> Dict:
         """Parse HTML content to extract article data"""
-        soup = BeautifulSoup(html, 'lxml')
+        try:
+            root = lxml_html.document_fromstring(html)
+        except etree.ParserError:
+            # Malformed or empty documents go through BeautifulSoup instead
+            root = soupparser.fromstring(html)
+        return self._parse_tree(root, url)
+    
+    def _parse_tree(self, root, url: str) -> Dict:
+        """Extract article data from a parsed HTML tree"""
+        # Title and metadata often live in page chrome, so read them first
+        title = self._extract_title(root)
+        metadata = self._extract_metadata(root, url)
         
-        # Extract title
-        title = self._extract_title(soup)
+        # Drop scripts and page chrome once for content and citation extraction
+        etree.strip_elements(root, *_NON_CONTENT_TAGS, with_tail=False)
         
         # Extract main content
-        content = self._extract_content(soup)
+        content = self._extract_content(root)
         
         # Extract citations
-        citations = self._extract_citations(soup, content)
-        
-        # Extract metadata
-        metadata = self._extract_metadata(soup, url)
+        citations = self._extract_citations(root, content)
         
         return {
             "url": url,
@@ -101,119 +245,101 @@ class ArticleIngester:
             "citation_count": len(citations)
         }
     
-    def _extract_title(self, soup: BeautifulSoup) -> str:
+    @staticmethod
+    def _element_text(element, separator: str = "") -> str:
+        """Join the stripped, non-empty text nodes of an element"""
+        return separator.join(
+            text.strip() for text in element.itertext() if text.strip()
+        )
+    
+    def _extract_title(self, root) -> str:
         """Extract article title"""
         # Try various title selectors
-        title_selectors = [
-            'h1.article-title',
-            'h1',
-            '.title',
-            'title'
-        ]
-        
-        for selector in title_selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
+        for selector in _TITLE_SELECTORS:
+            elements = selector(root)
+            if elements:
+                return self._element_text(elements[0])
         
         return "Untitled Article"
     
-    def _extract_content(self, soup: BeautifulSoup) -> str:
+    def _extract_content(self, root) -> str:
         """Extract main article content"""
         # Try various content selectors
-        content_selectors = [
-            '.article-content',
-            '.main-content',
-            'article',
-            '.content',
-            'main'
-        ]
-        
-        for selector in content_selectors:
-            element = soup.select_one(selector)
-            if element:
-                # Remove script and style elements
-                for script in element(["script", "style", "nav", "footer", "header"]):
-                    script.decompose()
-                return element.get_text(separator='\n', strip=True)
+        for selector in _CONTENT_SELECTORS:
+            elements = selector(root)
+            if elements:
+                return self._element_text(elements[0], separator='\n')
         
         # Fallback: get body text
-        body = soup.find('body')
-        if body:
-            for script in body(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            return body.get_text(separator='\n', strip=True)
+        body = root.find('body')
+        if body is not None:
+            return self._element_text(body, separator='\n')
         
         return ""
     
-    def _extract_citations(self, soup: BeautifulSoup, content: str) -> List[Dict]:
+    def _extract_citations(self, root, content: str) -> List[utils.Citation]:
         """Extract all citations from article"""
         citations = []
+        seen_urls = set()
         
         # Extract from HTML links
-        links = soup.find_all('a', href=True)
-        for link in links:
-            href = link.get('href', '')
-            if self._is_valid_citation_url(href):
-                text = link.get_text(strip=True) or href
-                citations.append({
-                    "url": href,
-                    "text": text,
-                    "type": "html",
-                    "source_type": utils.classify_source_type(href),
-                    "domain": utils.normalize_domain(href),
-                    "reliability": utils.calculate_reliability_score(
-                        href, 
-                        utils.classify_source_type(href)
-                    )
-                })
+        for link in root.iter('a'):
+            href = link.get('href')
+            if href is None or not self._is_valid_citation_url(href):
+                continue
+            key = self._citation_key(href)
+            if key in seen_urls:
+                continue
+            seen_urls.add(key)
+            text = self._element_text(link) or href
+            citations.append(self._build_citation(href, text, "html"))
         
         # Also extract from text patterns
-        text_citations = utils.extract_citations_from_text(content)
-        for cit in text_citations:
-            if self._is_valid_citation_url(cit["url"]):
-                # Avoid duplicates
-                if not any(c["url"] == cit["url"] for c in citations):
-                    citations.append({
-                        "url": cit["url"],
-                        "text": cit.get("text", cit["url"]),
-                        "type": cit.get("type", "text"),
-                        "source_type": utils.classify_source_type(cit["url"]),
-                        "domain": utils.normalize_domain(cit["url"]),
-                        "reliability": utils.calculate_reliability_score(
-                            cit["url"],
-                            utils.classify_source_type(cit["url"])
-                        )
-                    })
-        
-        # Remove duplicates and normalize
-        unique_citations = []
-        seen_urls = set()
-        for cit in citations:
-            normalized_url = cit["url"].rstrip('/')
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                unique_citations.append(cit)
+        for cit in utils.iter_citations_from_text(content):
+            url = cit["url"]
+            if not self._is_valid_citation_url(url):
+                continue
+            key = self._citation_key(url)
+            if key in seen_urls:
+                continue
+            seen_urls.add(key)
+            citations.append(self._build_citation(
+                url,
+                cit.get("text", url),
+                cit.get("type", "text")
+            ))
         
-        return unique_citations
+        return citations
+    
+    @staticmethod
+    def _citation_key(url: str) -> str:
+        """Normalize a URL for duplicate detection"""
+        return url.rstrip('/').lower()
+    
+    def _build_citation(self, url: str, text: str, citation_type: str) -> utils.Citation:
+        """Build a citation record enriched with source metadata"""
+        source_type = utils.classify_source_type(url)
+        return utils.Citation(
+            url=url,
+            text=text,
+            type=citation_type,
+            source_type=source_type,
+            domain=utils.normalize_domain(url),
+            reliability=utils.calculate_reliability_score(url, source_type)
+        )
     
     def _is_valid_citation_url(self, url: str) -> bool:
         """Check if URL is a valid citation (not internal link)"""
-        if not url or not url.startswith(('http://', 'https://')):
+        try:
+            parts = urlsplit(url)
+            host = parts.hostname
+        except ValueError:
             return False
-        
-        # Filter out internal GrokiPedia links
-        if config.GROKIPEDIA_BASE_URL in url.lower():
+        if parts.scheme not in ("http", "https") or not host:
             return False
-        
-        # Filter out common non-citation URLs
-        excluded = ['mailto:', 'javascript:', '#', 'tel:']
-        if any(url.startswith(ex) for ex in excluded):
-            return False
-        
-        return True
+        return host not in _internal_hosts()
     
-    def _extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict:
+    def _extract_metadata(self, root, url: str) -> Dict:
         """Extract article metadata"""
         metadata = {
             "url": url,
@@ -223,30 +349,20 @@ class ArticleIngester:
         }
         
         # Try to extract last modified date
-        date_selectors = [
-            '.last-modified',
-            '.date',
-            'time',
-            '[datetime]'
-        ]
-        for selector in date_selectors:
-            element = soup.select_one(selector)
-            if element:
-                date_str = element.get('datetime') or element.get_text(strip=True)
+        for selector in _DATE_SELECTORS:
+            elements = selector(root)
+            if elements:
+                element = elements[0]
+                date_str = element.get('datetime') or self._element_text(element)
                 if date_str:
                     metadata["last_modified"] = date_str
                     break
         
         # Try to extract authors
-        author_selectors = [
-            '.author',
-            '.byline',
-            '[rel="author"]'
-        ]
-        for selector in author_selectors:
-            elements = soup.select(selector)
+        for selector in _AUTHOR_SELECTORS:
+            elements = selector(root)
             for elem in elements:
-                author = elem.get_text(strip=True)
+                author = self._element_text(elem)
                 if author:
                     metadata["authors"].append(author)
         
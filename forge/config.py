@@ -0,0 +1,13 @@
+"""Configuration for Citation Graph Auditor"""
+import os
+
+# Redis cache for fetched articles (disabled when REDIS_URL is unset)
+REDIS_URL = os.getenv("REDIS_URL")
+ARTICLE_CACHE_TTL = {
+    "short": 10,     # modified within the last day
+    "normal": 600,   # no usable modification date
+    "long": 3600     # unchanged for a day or more
+}
+
+# Larger citation graphs are cut down to their most reliable sources before plotting
+MAX_VIZ_NODES = 2000
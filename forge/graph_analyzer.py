@@ -1,5 +1,7 @@
 """Graph-theoretic analysis module for bias detection and citation quality"""
 import networkx as nx
+import numpy as np
+from collections import Counter
 from typing import Dict, List, Tuple, Optional
 import config
 import utils
@@ -15,14 +17,26 @@ class GraphAnalyzer:
         self._diversity_metrics_cache: Optional[Dict] = None
         self._quality_scores_cache: Optional[Dict] = None
         self._source_nodes_cache: Optional[List] = None
+        # Per-source attribute columns (domain, stype, rel), aligned with _source_nodes_cache
+        self._attrs: Dict = {"domain": [], "stype": [], "rel": np.empty(0)}
     
     def _get_source_nodes(self) -> List:
-        """Get source nodes with caching"""
+        """Get source nodes with caching (also caches their attribute columns)"""
         if self._source_nodes_cache is None:
-            self._source_nodes_cache = [
-                n for n in self.graph.nodes()
-                if self.graph.nodes[n].get("node_type") == "source"
-            ]
+            source_nodes, domains, stypes, reliabilities = [], [], [], []
+            for n, data in self.graph.nodes(data=True):
+                if data.get("node_type") != "source":
+                    continue
+                source_nodes.append(n)
+                domains.append(data.get("domain", "unknown"))
+                stypes.append(data.get("source_type", "other"))
+                reliabilities.append(data.get("reliability", 0.5))
+            self._source_nodes_cache = source_nodes
+            self._attrs = {
+                "domain": domains,
+                "stype": stypes,
+                "rel": np.array(reliabilities, dtype=float)
+            }
         return self._source_nodes_cache
     
     def analyze(self) -> Dict:
@@ -59,47 +73,27 @@ class GraphAnalyzer:
                 "ideological_cluster_score": 0.0
             }
         
+        total = len(source_nodes)
+        
         # Domain concentration
-        domains = [
-            self.graph.nodes[n].get("domain", "unknown")
-            for n in source_nodes
-        ]
-        domain_counts = {}
-        for domain in domains:
-            domain_counts[domain] = domain_counts.get(domain, 0) + 1
-        
-        total = len(domains)
-        if total > 0:
-            max_domain_count = max(domain_counts.values())
-            top_domain_percentage = max_domain_count / total
-        else:
-            top_domain_percentage = 0.0
+        domain_counts = Counter(self._attrs["domain"])
+        top_domain, max_domain_count = domain_counts.most_common(1)[0]
+        top_domain_percentage = max_domain_count / total
         
         # Source type concentration
-        source_types = [
-            self.graph.nodes[n].get("source_type", "other")
-            for n in source_nodes
-        ]
-        type_counts = {}
-        for stype in source_types:
-            type_counts[stype] = type_counts.get(stype, 0) + 1
-        
-        if total > 0:
-            max_type_count = max(type_counts.values())
-            single_cluster_risk = max_type_count / total
-        else:
-            single_cluster_risk = 0.0
+        type_counts = Counter(self._attrs["stype"])
+        single_cluster_risk = max(type_counts.values()) / total
         
         # Overall concentration score
         source_concentration = (top_domain_percentage + single_cluster_risk) / 2
         
-        return {
+        result = {
             "source_concentration": source_concentration,
             "single_cluster_risk": single_cluster_risk,
             "top_domain_percentage": top_domain_percentage,
-            "top_domain": max(domain_counts.items(), key=lambda x: x[1])[0] if domain_counts else None,
-            "domain_distribution": domain_counts,
-            "source_type_distribution": type_counts,
+            "top_domain": top_domain,
+            "domain_distribution": dict(domain_counts),
+            "source_type_distribution": dict(type_counts),
             "ideological_cluster_score": single_cluster_risk  # Simplified for MVP
         }
         
@@ -122,25 +116,19 @@ class GraphAnalyzer:
                 "overall_diversity": 0.0
             }
         
-        domains = [self.graph.nodes[n].get("domain", "") for n in source_nodes]
-        source_types = [self.graph.nodes[n].get("source_type", "other") for n in source_nodes]
-        reliabilities = [self.graph.nodes[n].get("reliability", 0.5) for n in source_nodes]
+        total = len(source_nodes)
         
         # Domain diversity
-        unique_domains = len(set(domains))
-        domain_diversity = unique_domains / len(domains) if domains else 0.0
+        unique_domains = len(set(self._attrs["domain"]))
+        domain_diversity = unique_domains / total
         
         # Source type diversity
-        unique_types = len(set(source_types))
-        source_type_diversity = unique_types / len(source_types) if source_types else 0.0
+        unique_types = len(set(self._attrs["stype"]))
+        source_type_diversity = unique_types / total
         
         # Reliability diversity (variance in reliability scores)
-        if reliabilities:
-            avg_reliability = sum(reliabilities) / len(reliabilities)
-            reliability_variance = sum((r - avg_reliability) ** 2 for r in reliabilities) / len(reliabilities)
-            reliability_diversity = min(1.0, reliability_variance * 4)  # Normalize
-        else:
-            reliability_diversity = 0.0
+        reliability_variance = float(np.var(self._attrs["rel"]))
+        reliability_diversity = min(1.0, reliability_variance * 4)  # Normalize
         
         # Overall diversity (weighted average)
         overall_diversity = (
@@ -149,7 +137,7 @@ class GraphAnalyzer:
             reliability_diversity * 0.2
         )
         
-        return {
+        result = {
             "domain_diversity": domain_diversity,
             "source_type_diversity": source_type_diversity,
             "reliability_diversity": reliability_diversity,
@@ -182,11 +170,8 @@ class GraphAnalyzer:
             })
         
         # Check for low-reliability sources
-        low_reliability_sources = [
-            n for n in source_nodes
-            if self.graph.nodes[n].get("reliability", 0.5) < 0.4
-        ]
-        if len(low_reliability_sources) > len(source_nodes) * 0.5:
+        low_reliability_count = int((self._attrs["rel"] < 0.4).sum())
+        if low_reliability_count > len(source_nodes) * 0.5:
             red_flags.append({
                 "type": "low_reliability_dominance",
                 "severity": "medium",
@@ -209,12 +194,9 @@ class GraphAnalyzer:
             })
         
         # Check for missing viewpoint diversity
-        source_types = [
-            self.graph.nodes[n].get("source_type", "other")
-            for n in source_nodes
-        ]
+        present_types = set(bias_metrics.get("source_type_distribution", {}))
         required_types = ["academic", "government", "news"]
-        missing_types = [t for t in required_types if t not in source_types]
+        missing_types = [t for t in required_types if t not in present_types]
         if missing_types:
             red_flags.append({
                 "type": "missing_viewpoint_diversity",
@@ -225,11 +207,11 @@ class GraphAnalyzer:
         return red_flags
     
     def _calculate_quality_scores(self) -> Dict:
-        """Calculate overall quality scores"""
-        source_nodes = [
-            n for n in self.graph.nodes()
-            if self.graph.nodes[n].get("node_type") == "source"
-        ]
+        """Calculate overall quality scores (with caching)"""
+        if self._quality_scores_cache is not None:
+            return self._quality_scores_cache
+        
+        source_nodes = self._get_source_nodes()
         
         if not source_nodes:
             return {
@@ -240,11 +222,7 @@ class GraphAnalyzer:
             }
         
         # Average reliability
-        reliabilities = [
-            self.graph.nodes[n].get("reliability", 0.5)
-            for n in source_nodes
-        ]
-        source_reliability = sum(reliabilities) / len(reliabilities)
+        source_reliability = float(self._attrs["rel"].mean())
         
         # Diversity score (use cached if available)
         diversity_metrics = self._calculate_diversity_metrics()
@@ -261,7 +239,7 @@ class GraphAnalyzer:
             citation_count_score * 0.3
         )
         
-        return {
+        result = {
             "citation_quality": overall_quality,
             "source_reliability": source_reliability,
             "diversity_score": diversity_score,
@@ -306,13 +284,9 @@ class GraphAnalyzer:
             recommendations.append("Average source reliability is low. Replace low-reliability sources with more authoritative ones.")
         
         missing_types = []
-        source_nodes = self._get_source_nodes()
-        source_types = set([
-            self.graph.nodes[n].get("source_type", "other")
-            for n in source_nodes
-        ])
+        present_types = set(bias_metrics.get("source_type_distribution", {}))
         for req_type in ["academic", "government"]:
-            if req_type not in source_types:
+            if req_type not in present_types:
                 missing_types.append(req_type)
         
         if missing_types:
@@ -1,128 +1,144 @@
 """Citation graph builder module"""
 import networkx as nx
+import numpy as np
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, List, Optional
 import config
 import utils
 
 
+@dataclass
+class CitationGraph:
+    """Article -> source citation graph stored as parallel per-source columns"""
+    article_id: str
+    article_attrs: Dict
+    source_ids: List[str]
+    domains: List[str]
+    source_types: List[str]
+    reliabilities: np.ndarray
+    edge_weights: np.ndarray
+    edge_texts: List[str]
+    
+    def to_networkx(self) -> nx.DiGraph:
+        """Materialize as a NetworkX DiGraph for analysis and visualization"""
+        graph = nx.DiGraph()
+        graph.add_node(self.article_id, node_type="article", **self.article_attrs)
+        
+        graph.add_nodes_from(
+            (source_id, {
+                "node_type": "source",
+                "domain": domain,
+                "source_type": source_type,
+                "reliability": reliability
+            })
+            for source_id, domain, source_type, reliability in zip(
+                self.source_ids, self.domains, self.source_types, self.reliabilities.tolist()
+            )
+        )
+        graph.add_edges_from(
+            (self.article_id, source_id, {"weight": weight, "citation_text": text})
+            for source_id, weight, text in zip(
+                self.source_ids, self.edge_weights.tolist(), self.edge_texts
+            )
+        )
+        
+        return graph
+    
+    @cached_property
+    def stats(self) -> Dict:
+        """Basic graph statistics, computed on first access"""
+        source_count = len(self.source_ids)
+        total_nodes = source_count + 1
+        total_edges = source_count
+        
+        avg_reliability = float(self.reliabilities.mean()) if source_count else 0.0
+        
+        # Directed graph density: E / (V * (V - 1))
+        density = total_edges / (total_nodes * (total_nodes - 1)) if total_nodes > 1 else 0.0
+        
+        return {
+            "total_nodes": total_nodes,
+            "article_nodes": 1,
+            "source_nodes": source_count,
+            "total_edges": total_edges,
+            "source_type_distribution": dict(Counter(self.source_types)),
+            "average_reliability": avg_reliability,
+            "graph_density": density
+        }
+
+
 class CitationGraphBuilder:
     """Build weighted citation graphs from article data"""
     
     def __init__(self):
         self.graph = nx.DiGraph()
+        self.citation_graph = None
     
     def build_graph(self, article_data: Dict) -> nx.DiGraph:
-        """Build citation graph from article data"""
-        self.graph = nx.DiGraph()
-        
+        """Build citation graph from article data whose "citations" are utils.Citation records"""
         article_id = article_data["url"]
         citations = article_data.get("citations", [])
         
-        # Add article node
-        self.graph.add_node(
-            article_id,
-            node_type="article",
-            title=article_data.get("title", ""),
-            word_count=article_data.get("word_count", 0),
-            citation_count=len(citations)
-        )
+        # Diversity boosts depend only on the article, so compute them once
+        diversity_boost = utils.calculate_diversity_score([c.domain for c in citations]) * 0.2
+        type_boost = min(0.1, len({c.source_type for c in citations}) * 0.02)
         
-        # Add source nodes and edges
+        # De-duplicate by URL: repeat citations keep the first node attributes,
+        # while the last one sets the edge
+        first, last = {}, {}
         for citation in citations:
-            source_id = citation["url"]
-            
-            # Add source node if not exists
-            if not self.graph.has_node(source_id):
-                self.graph.add_node(
-                    source_id,
-                    node_type="source",
-                    domain=citation.get("domain", ""),
-                    source_type=citation.get("source_type", "other"),
-                    reliability=citation.get("reliability", 0.5)
-                )
-            
-            # Calculate edge weight
-            weight = self._calculate_edge_weight(citation, article_data)
-            
-            # Add edge: article -> source
-            self.graph.add_edge(
-                article_id,
-                source_id,
-                weight=weight,
-                citation_text=citation.get("text", "")
-            )
+            first.setdefault(citation.url, citation)
+            last[citation.url] = citation
         
-        return self.graph
-    
-    def _calculate_edge_weight(self, citation: Dict, article_data: Dict) -> float:
-        """Calculate edge weight based on reliability and diversity signals"""
-        base_weight = citation.get("reliability", 0.5)
+        sources = list(first.values())
+        edges = list(last.values())
         
-        # Boost for domain diversity
-        all_domains = [c.get("domain", "") for c in article_data.get("citations", [])]
-        diversity = utils.calculate_diversity_score(all_domains)
-        diversity_boost = diversity * 0.2
+        # Edge weight: source reliability plus the article's diversity boosts, clipped to [0, 1]
+        edge_weights = np.clip(
+            np.fromiter((c.reliability for c in edges), dtype=float, count=len(edges)) + diversity_boost + type_boost,
+            0.0,
+            1.0
+        )
         
-        # Boost for source type diversity
-        source_types = [c.get("source_type", "other") for c in article_data.get("citations", [])]
-        unique_types = len(set(source_types))
-        type_boost = min(0.1, unique_types * 0.02)
+        self.citation_graph = CitationGraph(
+            article_id=article_id,
+            article_attrs={
+                "title": article_data.get("title", ""),
+                "word_count": article_data.get("word_count", 0),
+                "citation_count": len(citations)
+            },
+            source_ids=list(first),
+            domains=[c.domain for c in sources],
+            source_types=[c.source_type for c in sources],
+            reliabilities=np.fromiter((c.reliability for c in sources), dtype=float, count=len(sources)),
+            edge_weights=edge_weights,
+            edge_texts=[c.text for c in edges]
+        )
         
-        # Final weight
-        weight = base_weight + diversity_boost + type_boost
-        return min(1.0, max(0.0, weight))
+        self.graph = self.citation_graph.to_networkx()
+        return self.graph
+    
+    @property
+    def stats(self) -> Dict:
+        """Statistics for the last built graph, computed lazily and cached with it"""
+        if self.citation_graph is None:
+            return {}
+        return self.citation_graph.stats
     
     def get_graph_stats(self) -> Dict:
         """Get basic graph statistics"""
-        if not self.graph:
-            return {}
-        
-        nodes = list(self.graph.nodes())
-        edges = list(self.graph.edges())
-        
-        # Count node types
-        article_nodes = [n for n in nodes if self.graph.nodes[n].get("node_type") == "article"]
-        source_nodes = [n for n in nodes if self.graph.nodes[n].get("node_type") == "source"]
-        
-        # Count source types
-        source_type_counts = {}
-        for node in source_nodes:
-            source_type = self.graph.nodes[node].get("source_type", "other")
-            source_type_counts[source_type] = source_type_counts.get(source_type, 0) + 1
-        
-        # Calculate average reliability
-        reliabilities = [
-            self.graph.nodes[n].get("reliability", 0.5)
-            for n in source_nodes
-        ]
-        avg_reliability = sum(reliabilities) / len(reliabilities) if reliabilities else 0.0
-        
-        return {
-            "total_nodes": len(nodes),
-            "article_nodes": len(article_nodes),
-            "source_nodes": len(source_nodes),
-            "total_edges": len(edges),
-            "source_type_distribution": source_type_counts,
-            "average_reliability": avg_reliability,
-            "graph_density": nx.density(self.graph) if len(nodes) > 1 else 0.0
-        }
+        return self.stats
     
     def get_source_clusters(self) -> Dict[str, List[str]]:
         """Group sources by domain and source type"""
-        clusters = {}
+        if self.citation_graph is None:
+            return {}
         
-        for node in self.graph.nodes():
-            node_data = self.graph.nodes[node]
-            if node_data.get("node_type") == "source":
-                domain = node_data.get("domain", "unknown")
-                source_type = node_data.get("source_type", "other")
-                
-                # Create cluster key
-                cluster_key = f"{source_type}:{domain}"
-                
-                if cluster_key not in clusters:
-                    clusters[cluster_key] = []
-                clusters[cluster_key].append(node)
+        graph = self.citation_graph
+        clusters = defaultdict(list)
+        for node, domain, source_type in zip(graph.source_ids, graph.domains, graph.source_types):
+            clusters[f"{source_type}:{domain}"].append(node)
         
-        return clusters
-
+        return dict(clusters)
@@ -1,11 +1,32 @@
 """xAI API (Grok) integration for generating edit suggestions"""
-from openai import OpenAI
+import httpx
 from typing import Dict, List, Optional
-import json
+import orjson
+import re
+import time
 import config
 import utils
 
 
+# Markdown code fences the model sometimes wraps its JSON in
+_FENCE_OPEN_RE = re.compile(r'\A```[^\n]*\n')
+_FENCE_CLOSE_RE = re.compile(r'\n```\Z')
+
+# Rate-limit and transient server statuses worth retrying (the transport only retries connect errors)
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_STATUS_RETRIES = 3
+_BACKOFF_BASE = 0.5
+_MAX_RETRY_DELAY = 30.0
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, from Retry-After if given in seconds, else exponential backoff"""
+    retry_after = response.headers.get("Retry-After", "").strip()
+    if retry_after.isdigit():
+        return min(float(retry_after), _MAX_RETRY_DELAY)
+    return _BACKOFF_BASE * 2 ** attempt
+
+
 class GrokIntegration:
     """Interface with xAI API to generate citation fixes and rewrites"""
     
@@ -13,11 +34,19 @@ class GrokIntegration:
         if not config.XAI_API_KEY:
             raise ValueError("XAI_API_KEY not set in environment variables")
         
-        self.client = OpenAI(
-            api_key=config.XAI_API_KEY,
-            base_url=config.XAI_API_BASE
+        # One keep-alive HTTP/2 client shared by all requests (and the CLI's worker threads)
+        self.client = httpx.Client(
+            base_url=config.XAI_API_BASE,
+            headers={
+                "Authorization": f"Bearer {config.XAI_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            transport=httpx.HTTPTransport(http2=True, retries=2)
         )
         self.model = config.XAI_MODEL
+        # (article_data, analysis_results, context) for the last prompt context built
+        self._context_cache = None
     
     def generate_citation_suggestions(
         self,
@@ -29,8 +58,7 @@ class GrokIntegration:
         prompt = self._build_citation_suggestion_prompt(article_data, analysis_results)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response_text = self._chat(
                 messages=[
                     {
                         "role": "system",
@@ -45,8 +73,7 @@ class GrokIntegration:
                 max_tokens=2000
             )
             
-            suggestions_text = response.choices[0].message.content
-            return self._parse_citation_suggestions(suggestions_text, article_data)
+            return self._parse_citation_suggestions(response_text, article_data)
             
         except Exception as e:
             print(f"Error generating citation suggestions: {e}")
@@ -62,8 +89,7 @@ class GrokIntegration:
         prompt = self._build_rewrite_prompt(article_data, analysis_results)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response_text = self._chat(
                 messages=[
                     {
                         "role": "system",
@@ -78,8 +104,7 @@ class GrokIntegration:
                 max_tokens=3000
             )
             
-            rewrites_text = response.choices[0].message.content
-            return self._parse_rewrites(rewrites_text)
+            return self._parse_rewrites(response_text)
             
         except Exception as e:
             print(f"Error generating rewrites: {e}")
@@ -96,8 +121,7 @@ class GrokIntegration:
         prompt = self._build_explanation_prompt(article_data, analysis_results, suggestions)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response_text = self._chat(
                 messages=[
                     {
                         "role": "system",
@@ -112,12 +136,70 @@ class GrokIntegration:
                 max_tokens=1500
             )
             
-            return response.choices[0].message.content
+            return response_text
             
         except Exception as e:
             print(f"Error generating explanation: {e}")
             return "Explanation generation failed."
     
+    def _chat(self, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        """POST a chat completion to the xAI API and return the reply text"""
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        body = orjson.dumps(payload)
+        for attempt in range(_MAX_STATUS_RETRIES + 1):
+            response = self.client.post("chat/completions", content=body)
+            if response.status_code not in _RETRY_STATUSES or attempt == _MAX_STATUS_RETRIES:
+                break
+            time.sleep(_retry_delay(response, attempt))
+        response.raise_for_status()
+        return orjson.loads(response.content)["choices"][0]["message"]["content"]
+    
+    def _build_context(self, article_data: Dict, analysis_results: Dict) -> Dict:
+        """Pre-format the article and analysis fields shared by all prompts (citations are utils.Citation records)"""
+        cached = self._context_cache
+        if cached is not None and cached[0] is article_data and cached[1] is analysis_results:
+            return cached[2]
+        
+        existing_citations = article_data.get("citations", [])
+        bias_metrics = analysis_results.get("bias_metrics", {})
+        diversity_metrics = analysis_results.get("diversity_metrics", {})
+        quality_scores = analysis_results.get("quality_scores", {})
+        
+        # One walk over the citations for both the type set and the first 10 lines
+        source_types = set()
+        existing_lines = []
+        for i, c in enumerate(existing_citations):
+            source_types.add(c.source_type)
+            if i < 10:
+                existing_lines.append(f"- [{c.source_type}] {c.domain}: {c.url}")
+        
+        context = {
+            "title": article_data.get("title", "Unknown"),
+            "excerpt": article_data.get("content", "")[:2000],  # Limit content length
+            "n_cites": len(existing_citations),
+            "concentration_pct": f"{bias_metrics.get('source_concentration', 0):.2%}",
+            "cluster_risk_pct": f"{bias_metrics.get('single_cluster_risk', 0):.2%}",
+            "top_domain": bias_metrics.get("top_domain", "N/A"),
+            "diversity_pct": f"{diversity_metrics.get('overall_diversity', 0):.2%}",
+            "quality_pct": f"{quality_scores.get('overall_quality', 0):.2%}",
+            "types_str": ", ".join(source_types),
+            "existing_lines": "\n".join(existing_lines),
+            "red_flag_lines": "\n".join(
+                f"- {flag.get('message', '')}" for flag in analysis_results.get("red_flags", [])[:5]
+            ),
+            "recommendation_lines": "\n".join(
+                f"- {rec}" for rec in analysis_results.get("recommendations", [])
+            )
+        }
+        
+        self._context_cache = (article_data, analysis_results, context)
+        return context
+    
     def _build_citation_suggestion_prompt(
         self,
         article_data: Dict,
@@ -125,28 +207,25 @@ class GrokIntegration:
     ) -> str:
         """Build prompt for citation suggestions"""
         
-        existing_citations = article_data.get("citations", [])
-        bias_metrics = analysis_results.get("bias_metrics", {})
-        diversity_metrics = analysis_results.get("diversity_metrics", {})
-        red_flags = analysis_results.get("red_flags", [])
+        ctx = self._build_context(article_data, analysis_results)
         
         prompt = f"""Analyze this GrokiPedia article and suggest 5-10 new high-quality citations to improve diversity and reliability.
 
-Article Title: {article_data.get('title', 'Unknown')}
-Topic: {article_data.get('title', 'Unknown')}
+Article Title: {ctx['title']}
+Topic: {ctx['title']}
 
 Current Citation Analysis:
-- Total citations: {len(existing_citations)}
-- Source concentration: {bias_metrics.get('source_concentration', 0):.2%}
-- Top domain: {bias_metrics.get('top_domain', 'N/A')}
-- Diversity score: {diversity_metrics.get('overall_diversity', 0):.2%}
-- Source types present: {', '.join(set(c.get('source_type', 'other') for c in existing_citations))}
+- Total citations: {ctx['n_cites']}
+- Source concentration: {ctx['concentration_pct']}
+- Top domain: {ctx['top_domain']}
+- Diversity score: {ctx['diversity_pct']}
+- Source types present: {ctx['types_str']}
 
 Issues Detected:
-{chr(10).join(f"- {flag.get('message', '')}" for flag in red_flags[:5])}
+{ctx['red_flag_lines']}
 
 Current Citations:
-{chr(10).join(f"- [{c.get('source_type', 'other')}] {c.get('domain', 'unknown')}: {c.get('url', '')}" for c in existing_citations[:10])}
+{ctx['existing_lines']}
 
 Please suggest 5-10 new citations that:
 1. Come from diverse, high-reliability sources (academic, government, reputable news)
@@ -177,19 +256,18 @@ Return ONLY valid JSON, no markdown formatting."""
     ) -> str:
         """Build prompt for bias-neutral rewrites"""
         
-        content = article_data.get("content", "")[:2000]  # Limit content length
-        bias_metrics = analysis_results.get("bias_metrics", {})
+        ctx = self._build_context(article_data, analysis_results)
         
         prompt = f"""Rewrite specific paragraphs from this GrokiPedia article to be more neutral and better cited.
 
-Article Title: {article_data.get('title', 'Unknown')}
+Article Title: {ctx['title']}
 
 Bias Analysis:
-- Source concentration: {bias_metrics.get('source_concentration', 0):.2%}
-- Single cluster risk: {bias_metrics.get('single_cluster_risk', 0):.2%}
+- Source concentration: {ctx['concentration_pct']}
+- Single cluster risk: {ctx['cluster_risk_pct']}
 
 Article Content (excerpt):
-{content}
+{ctx['excerpt']}
 
 Identify 2-3 paragraphs that:
 1. Show ideological bias or loaded language
@@ -223,21 +301,19 @@ Return ONLY valid JSON, no markdown formatting."""
     ) -> str:
         """Build prompt for explanation generation"""
         
-        bias_metrics = analysis_results.get("bias_metrics", {})
-        quality_scores = analysis_results.get("quality_scores", {})
-        recommendations = analysis_results.get("recommendations", [])
+        ctx = self._build_context(article_data, analysis_results)
         
         prompt = f"""Explain the citation analysis and recommendations for this GrokiPedia article in clear, actionable terms.
 
-Article: {article_data.get('title', 'Unknown')}
+Article: {ctx['title']}
 
 Key Findings:
-- Overall quality: {quality_scores.get('overall_quality', 0):.2%}
-- Source concentration: {bias_metrics.get('source_concentration', 0):.2%}
-- Top domain: {bias_metrics.get('top_domain', 'N/A')}
+- Overall quality: {ctx['quality_pct']}
+- Source concentration: {ctx['concentration_pct']}
+- Top domain: {ctx['top_domain']}
 
 Recommendations:
-{chr(10).join(f"- {rec}" for rec in recommendations)}
+{ctx['recommendation_lines']}
 
 Suggested Citations: {len(suggestions)}
 
@@ -251,6 +327,12 @@ Write in a professional but accessible tone, suitable for GrokiPedia editors."""
         
         return prompt
     
+    @staticmethod
+    def _extract_json(text: str) -> str:
+        """Strip whitespace and any surrounding markdown code fence from a response"""
+        text = text.strip()
+        return _FENCE_CLOSE_RE.sub('', _FENCE_OPEN_RE.sub('', text))
+    
     def _parse_citation_suggestions(
         self,
         suggestions_text: str,
@@ -260,41 +342,32 @@ Write in a professional but accessible tone, suitable for GrokiPedia editors."""
         suggestions = []
         
         try:
-            # Try to extract JSON from response
-            # Remove markdown code blocks if present
-            text = suggestions_text.strip()
-            if text.startswith("```"):
-                # Extract JSON from code block
-                lines = text.split("\n")
-                text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-            
             # Parse JSON
-            parsed = json.loads(text)
+            parsed = orjson.loads(self._extract_json(suggestions_text))
             if isinstance(parsed, list):
                 for item in parsed:
                     if isinstance(item, dict) and "url" in item:
-                        # Enrich with metadata
-                        item["source_type"] = item.get("source_type", utils.classify_source_type(item["url"]))
-                        item["domain"] = utils.normalize_domain(item["url"])
-                        item["reliability"] = item.get("reliability_score", utils.calculate_reliability_score(
-                            item["url"],
-                            item["source_type"]
-                        ))
+                        # Enrich with metadata, classifying only what Grok didn't provide
+                        url = item["url"]
+                        if "source_type" not in item:
+                            item["source_type"] = utils.classify_source_type(url)
+                        item["domain"] = utils.normalize_domain(url)
+                        if "reliability_score" in item:
+                            item["reliability"] = item["reliability_score"]
+                        else:
+                            item["reliability"] = utils.calculate_reliability_score(url, item["source_type"])
                         suggestions.append(item)
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # Fallback: try to extract URLs and basic info
-            import re
             urls = re.findall(r'https?://[^\s<>"\'\)]+', suggestions_text)
             for url in urls[:10]:
+                source_type = utils.classify_source_type(url)
                 suggestions.append({
                     "url": url,
                     "title": "Suggested Source",
-                    "source_type": utils.classify_source_type(url),
+                    "source_type": source_type,
                     "domain": utils.normalize_domain(url),
-                    "reliability": utils.calculate_reliability_score(
-                        url,
-                        utils.classify_source_type(url)
-                    ),
+                    "reliability": utils.calculate_reliability_score(url, source_type),
                     "reason": "AI-suggested citation"
                 })
         
@@ -305,16 +378,10 @@ Write in a professional but accessible tone, suitable for GrokiPedia editors."""
         rewrites = []
         
         try:
-            # Try to extract JSON from response
-            text = rewrites_text.strip()
-            if text.startswith("```"):
-                lines = text.split("\n")
-                text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
-            
-            parsed = json.loads(text)
+            parsed = orjson.loads(self._extract_json(rewrites_text))
             if isinstance(parsed, list):
                 rewrites = parsed
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # Fallback: return empty list
             pass
         
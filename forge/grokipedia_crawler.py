@@ -2,24 +2,106 @@
 """
 Grokipedia Crawler - Extracts raw text from Grokipedia.com article pages.
 """
+import json
 import re
 import requests
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+
+
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Next.js RSC payload chunks streamed via self.__next_f.push()
+_NEXT_F_PUSH_RE = re.compile(r'self\.__next_f\.push\(\[1,"(.+?)"\]\)</script>')
+_PUSH_START = 'self.__next_f.push('
+_PUSH_END = '"])</script>'
+
+# Escape sequences in chunks that are not valid JSON string bodies
+_ESCAPE_RE = re.compile(r'\\([ntr"\'\\])')
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+
+# Markdown cleanup passes
+_IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]*(?:\\\)[^)]*)*\)')
+_STRAY_PAREN_LINE_RE = re.compile(r'^\s*\)*\s*$', re.MULTILINE)
+_EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+
+# Link passes. Each runs on the text left by the one before, so removing an
+# embedded empty link "[](...)" can expose the link around it.
+_EMPTY_LINK_RE = re.compile(r'\[\]\([^)]+\)')
+_INTERNAL_LINK_RE = re.compile(r'\[([^\]]+)\]\(https://grokipedia\.com/[^)]*\)')
+_CITATION_LINK_RE = re.compile(r'\[([^\]]+)\]\((https?://[^)]+)\)')
+
+# Reused across calls so Grokipedia connections stay alive between fetches
+_SESSION = requests.Session()
 
 
 def fetch_page(url: str) -> str:
     """Fetch the HTML content of a page."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
-    
-    response = requests.get(url, headers=headers, timeout=30)
+    response = _SESSION.get(url, headers=REQUEST_HEADERS, timeout=30)
     response.raise_for_status()
     return response.text
 
 
+def _unescape_chunk(chunk: str) -> str:
+    """Decode the escapes of an RSC string chunk in a single pass."""
+    try:
+        return json.loads('"' + chunk + '"', strict=False)
+    except ValueError:
+        return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(1)], chunk)
+
+
+def _is_article_chunk(chunk: str) -> bool:
+    """Check if an RSC chunk holds the article markdown (starts with # Title)."""
+    return chunk.startswith("# ") or "\\n# " in chunk[:100]
+
+
+def stream_article_chunk(url: str) -> str:
+    """
+    Stream a Grokipedia page and return the raw article RSC chunk.
+    
+    Chunks are scanned as they arrive and the download stops as soon as the
+    article chunk is complete, so the rest of the page is never read.
+    """
+    with _SESSION.get(url, headers=REQUEST_HEADERS, timeout=30, stream=True) as response:
+        # A missing page is an expected miss (e.g. probing topic URLs), not an error
+        if response.status_code in (404, 410):
+            return ""
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        
+        buffer = ""
+        for part in response.iter_content(chunk_size=65536, decode_unicode=True):
+            buffer += part
+            # Only rescan once a push() call may have been closed by this read
+            if _PUSH_END not in buffer[-(len(part) + len(_PUSH_END)):]:
+                continue
+            
+            scanned = 0
+            for match in _NEXT_F_PUSH_RE.finditer(buffer):
+                if _is_article_chunk(match.group(1)):
+                    return match.group(1)
+                scanned = match.end()
+            
+            # Carry over only the unfinished push() call, if any
+            start = buffer.find(_PUSH_START, scanned)
+            buffer = buffer[start:] if start != -1 else buffer[-len(_PUSH_START):]
+    
+    return ""
+
+
+def _find_article_chunk(html: str) -> str:
+    """Return the raw RSC chunk holding the article markdown, or an empty string."""
+    # Find the chunk containing the article (starts with # Title)
+    for chunk in _NEXT_F_PUSH_RE.findall(html):
+        if _is_article_chunk(chunk):
+            return chunk
+    return ""
+
+
 def extract_markdown_content(html: str) -> str:
     """
     Extract markdown content from Grokipedia's Next.js RSC payload.
@@ -27,50 +109,47 @@ def extract_markdown_content(html: str) -> str:
     Grokipedia uses Next.js Server Components which stream content via
     self.__next_f.push() calls. The article markdown is in one of these chunks.
     """
-    # Find all __next_f.push chunks
-    pattern = r'self\.__next_f\.push\(\[1,"(.+?)"\]\)</script>'
-    matches = re.findall(pattern, html)
-    
-    if not matches:
-        return ""
-    
-    # Find the chunk containing the article (starts with # Title)
-    markdown = ""
-    for chunk in matches:
-        if chunk.startswith("# ") or "\\n# " in chunk[:100]:
-            markdown = chunk
-            break
+    markdown, _ = _clean_markdown(_find_article_chunk(html))
+    return markdown
+
+
+def _clean_markdown(markdown: str) -> Tuple[str, List[Dict]]:
+    """
+    Unescape and clean a raw article chunk, then collect the external links left in it.
     
+    Returns:
+        Tuple of (cleaned markdown, external citations from markdown links)
+    """
     if not markdown:
-        return ""
+        return "", []
     
     # Unescape the string
-    markdown = markdown.replace("\\n", "\n")
-    markdown = markdown.replace("\\t", "\t")
-    markdown = markdown.replace('\\"', '"')
-    markdown = markdown.replace("\\'", "'")
-    markdown = markdown.replace("\\\\", "\\")
+    markdown = _unescape_chunk(markdown)
     
     # Clean up the markdown:
     # 1. Remove image references: ![alt](url) - handle escaped parentheses in URLs
-    markdown = re.sub(r'!\[[^\]]*\]\([^)]*(?:\\\)[^)]*)*\)', '', markdown)
+    markdown = _IMAGE_RE.sub('', markdown)
     
     # 2. Remove inline reference links: [](url) - empty link text with just refs
-    markdown = re.sub(r'\[\]\([^)]+\)', '', markdown)
+    markdown = _EMPTY_LINK_RE.sub('', markdown)
     
     # 3. Clean up stray parentheses/brackets left from image removal
-    markdown = re.sub(r'^\s*\)*\s*$', '', markdown, flags=re.MULTILINE)
+    markdown = _STRAY_PAREN_LINE_RE.sub('', markdown)
     
     # 4. Convert Grokipedia internal links to just text: [Text](https://grokipedia.com/...)
-    markdown = re.sub(r'\[([^\]]+)\]\(https://grokipedia\.com/[^)]*\)', r'\1', markdown)
+    markdown = _INTERNAL_LINK_RE.sub(r'\1', markdown)
     
-    # 5. Keep external reference links for citation extraction
-    # Don't remove them - we want to extract citations from them
+    # 5. Clean up excessive whitespace
+    markdown = _EXCESS_NEWLINES_RE.sub('\n\n', markdown).strip()
     
-    # 6. Clean up excessive whitespace
-    markdown = re.sub(r'\n{3,}', '\n\n', markdown)
+    # 6. Record the external reference links left in the cleaned text as citations
+    citations = [
+        {"text": match.group(1), "url": match.group(2), "type": "markdown"}
+        for match in _CITATION_LINK_RE.finditer(markdown)
+        if 'grokipedia.com' not in match.group(2).lower()
+    ]
     
-    return markdown.strip()
+    return markdown, citations
 
 
 def extract_title_from_markdown(markdown: str) -> str:
@@ -82,6 +161,35 @@ def extract_title_from_markdown(markdown: str) -> str:
     return "Untitled Article"
 
 
+def parse_grokipedia_article(html: str, url: str) -> Optional[Dict]:
+    """
+    Extract article data from an already fetched Grokipedia page.
+    
+    Returns:
+        Dict with 'title', 'content', 'url', 'citations' (extracted from markdown links),
+        or None if the page has no article markdown
+    """
+    markdown, citations = _clean_markdown(_find_article_chunk(html))
+    return _article_from_markdown(markdown, citations, url)
+
+
+def _article_from_markdown(markdown: str, citations: List[Dict], url: str) -> Optional[Dict]:
+    """Build the article dict from cleaned markdown, or None if it is empty."""
+    if not markdown:
+        return None
+    
+    title = extract_title_from_markdown(markdown)
+    
+    return {
+        "url": url,
+        "title": title,
+        "content": markdown,
+        "citations": citations,
+        "word_count": len(markdown.split()),
+        "citation_count": len(citations)
+    }
+
+
 def fetch_grokipedia_article(url: str) -> Optional[Dict]:
     """
     Fetch and extract article from Grokipedia URL.
@@ -90,39 +198,10 @@ def fetch_grokipedia_article(url: str) -> Optional[Dict]:
         Dict with 'title', 'content', 'url', 'citations' (extracted from markdown links)
     """
     try:
-        html = fetch_page(url)
-        markdown = extract_markdown_content(html)
-        
-        if not markdown:
-            return None
-        
-        title = extract_title_from_markdown(markdown)
-        
-        # Extract citations from markdown links (external URLs only)
-        citations = []
-        citation_pattern = r'\[([^\]]+)\]\((https?://[^)]+)\)'
-        for match in re.finditer(citation_pattern, markdown):
-            link_text = match.group(1)
-            link_url = match.group(2)
-            
-            # Skip Grokipedia internal links
-            if 'grokipedia.com' not in link_url.lower():
-                citations.append({
-                    "text": link_text,
-                    "url": link_url,
-                    "type": "markdown"
-                })
-        
-        return {
-            "url": url,
-            "title": title,
-            "content": markdown,
-            "citations": citations,
-            "word_count": len(markdown.split()),
-            "citation_count": len(citations)
-        }
+        markdown, citations = _clean_markdown(stream_article_chunk(url))
+        return _article_from_markdown(markdown, citations, url)
         
-    except Exception as e:
+    except requests.RequestException as e:
         print(f"Error fetching Grokipedia article: {e}")
         return None
 
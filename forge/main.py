@@ -1,5 +1,6 @@
 """Main CLI entry point for Citation Graph Auditor"""
 import click
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
@@ -54,18 +55,24 @@ def main(url, topic, output_dir, format, no_viz, skip_grok):
         click.echo("Error: Failed to fetch article", err=True)
         sys.exit(1)
     
-    click.echo(f"✓ Article: {article_data.get('title', 'Unknown')}")
-    click.echo(f"✓ Found {len(article_data.get('citations', []))} citations")
+    title = article_data.get('title', 'Unknown')
+    citation_count = len(article_data.get('citations', []))
+    click.echo(f"✓ Article: {title}")
+    click.echo(f"✓ Found {citation_count} citations")
     click.echo()
     
     # Step 2: Build Citation Graph
     click.echo("Step 2: Building citation graph...")
     graph_builder = CitationGraphBuilder()
     graph = graph_builder.build_graph(article_data)
-    stats = graph_builder.get_graph_stats()
     
-    click.echo(f"✓ Graph: {stats.get('total_nodes', 0)} nodes, {stats.get('total_edges', 0)} edges")
-    click.echo(f"✓ Source types: {', '.join(stats.get('source_type_distribution', {}).keys())}")
+    # Stats are computed on first access and cached with the built graph
+    stats = graph_builder.stats
+    total_nodes = stats["total_nodes"]
+    total_edges = stats["total_edges"]
+    source_types = stats["source_type_distribution"]
+    click.echo(f"✓ Graph: {total_nodes} nodes, {total_edges} edges")
+    click.echo(f"✓ Source types: {', '.join(source_types)}")
     click.echo()
     
     # Step 3: Graph Analysis
@@ -90,29 +97,35 @@ def main(url, topic, output_dir, format, no_viz, skip_grok):
             click.echo("Step 4: Generating AI-powered suggestions...")
             grok = GrokIntegration()
             
-            # Generate citation suggestions
-            click.echo("  → Generating citation suggestions...")
-            citation_suggestions = grok.generate_citation_suggestions(
-                article_data,
-                analysis_results
-            )
-            click.echo(f"  ✓ Generated {len(citation_suggestions)} citation suggestions")
-            
-            # Generate rewrites
-            click.echo("  → Generating bias-neutral rewrites...")
-            rewrites = grok.generate_bias_neutral_rewrites(
-                article_data,
-                analysis_results
-            )
-            click.echo(f"  ✓ Generated {len(rewrites)} rewrite suggestions")
-            
-            # Generate explanation
-            click.echo("  → Generating explanation...")
-            explanation = grok.generate_explanation(
-                article_data,
-                analysis_results,
-                citation_suggestions
-            )
+            # Rewrites don't depend on the suggestions, so request them in the background
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                click.echo("  → Generating bias-neutral rewrites...")
+                rewrites_future = executor.submit(
+                    grok.generate_bias_neutral_rewrites,
+                    article_data,
+                    analysis_results
+                )
+                
+                # Generate citation suggestions
+                click.echo("  → Generating citation suggestions...")
+                citation_suggestions = grok.generate_citation_suggestions(
+                    article_data,
+                    analysis_results
+                )
+                click.echo(f"  ✓ Generated {len(citation_suggestions)} citation suggestions")
+                
+                # Generate explanation while the rewrites may still be in flight
+                click.echo("  → Generating explanation...")
+                explanation_future = executor.submit(
+                    grok.generate_explanation,
+                    article_data,
+                    analysis_results,
+                    citation_suggestions
+                )
+                
+                rewrites = rewrites_future.result()
+                click.echo(f"  ✓ Generated {len(rewrites)} rewrite suggestions")
+                explanation = explanation_future.result()
             click.echo("  ✓ Explanation generated")
             click.echo()
             
@@ -1,7 +1,12 @@
 """Output generator for edit proposals and reports"""
-import json
+from __future__ import annotations
+
+import networkx as nx
+import numpy as np
+import orjson
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 import config
 try:
@@ -11,6 +16,32 @@ try:
 except ImportError:
     PLOTLY_AVAILABLE = False
 
+# Above this many nodes the force-directed layout gets too slow; use the Laplacian eigenvectors instead
+SPECTRAL_LAYOUT_MIN_NODES = 500
+
+
+@dataclass(frozen=True)
+class _SuggestedCitation:
+    """A suggested citation with the display fallbacks already applied"""
+    __slots__ = ("title", "url", "source_type", "reliability", "report_reason", "instruction_reason")
+    
+    title: str
+    url: str
+    source_type: str
+    reliability: float
+    report_reason: str
+    instruction_reason: str  # the edit instructions use shorter fallback wording than the report
+
+
+@dataclass(frozen=True)
+class _Rewrite:
+    """A paragraph rewrite with missing fields defaulted to empty strings"""
+    __slots__ = ("original", "rewritten", "explanation")
+    
+    original: str
+    rewritten: str
+    explanation: str
+
 
 class OutputGenerator:
     """Generate JSON edit proposals, reports, and visualizations"""
@@ -19,6 +50,33 @@ class OutputGenerator:
         self.output_dir = output_dir or config.OUTPUT_DIR
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
+    @staticmethod
+    def _normalize_citations(citation_suggestions: List[Dict]) -> List[_SuggestedCitation]:
+        """Apply the citation field fallbacks once so the formatting loops read plain attributes"""
+        return [
+            _SuggestedCitation(
+                title=cit.get('title', cit.get('url', 'Unknown')),
+                url=cit.get('url', 'N/A'),
+                source_type=cit.get('source_type', 'unknown'),
+                reliability=cit.get('reliability', 0),
+                report_reason=cit.get('reason', 'Improves citation diversity'),
+                instruction_reason=cit.get('reason', 'Improves diversity')
+            )
+            for cit in citation_suggestions
+        ]
+    
+    @staticmethod
+    def _normalize_rewrites(rewrites: List[Dict]) -> List[_Rewrite]:
+        """Apply the rewrite field fallbacks once so the formatting loop reads plain attributes"""
+        return [
+            _Rewrite(
+                original=rewrite.get('original', ''),
+                rewritten=rewrite.get('rewritten', ''),
+                explanation=rewrite.get('explanation', '')
+            )
+            for rewrite in rewrites
+        ]
+    
     def generate_edit_proposal(
         self,
         article_data: Dict,
@@ -34,7 +92,7 @@ class OutputGenerator:
             "metadata": {
                 "article_url": article_data.get("url", ""),
                 "article_title": article_data.get("title", ""),
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": datetime.now(),
                 "tool_version": "1.0.0"
             },
             "analysis_summary": {
@@ -53,8 +111,9 @@ class OutputGenerator:
         }
         
         output_path = self.output_dir / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(proposal, f, indent=2, ensure_ascii=False)
+        # orjson writes UTF-8 bytes directly and serializes the datetime as ISO 8601
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(proposal, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
         
         return output_path
     
@@ -69,127 +128,116 @@ class OutputGenerator:
     ) -> Path:
         """Generate human-readable markdown summary report"""
         
-        report_lines = [
-            "# Citation Graph Audit Report",
-            "",
-            f"**Article:** {article_data.get('title', 'Unknown')}",
-            f"**URL:** {article_data.get('url', 'N/A')}",
-            f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-            "---",
-            "",
-            "## Executive Summary",
-            "",
-            explanation,
-            "",
-            "---",
-            "",
-            "## Analysis Results",
-            "",
-            "### Quality Scores",
-            ""
-        ]
-        
+        citations = self._normalize_citations(citation_suggestions)
+        rewrite_entries = self._normalize_rewrites(rewrites)
         quality_scores = analysis_results.get("quality_scores", {})
-        report_lines.extend([
-            f"- **Overall Quality:** {quality_scores.get('overall_quality', 0):.1%}",
-            f"- **Source Reliability:** {quality_scores.get('source_reliability', 0):.1%}",
-            f"- **Diversity Score:** {quality_scores.get('diversity_score', 0):.1%}",
-            f"- **Citation Count Score:** {quality_scores.get('citation_count_score', 0):.1%}",
-            ""
-        ])
-        
         bias_metrics = analysis_results.get("bias_metrics", {})
-        report_lines.extend([
-            "### Bias & Diversity Metrics",
-            "",
-            f"- **Source Concentration:** {bias_metrics.get('source_concentration', 0):.1%}",
-            f"- **Single Cluster Risk:** {bias_metrics.get('single_cluster_risk', 0):.1%}",
-            f"- **Top Domain:** {bias_metrics.get('top_domain', 'N/A')}",
-            f"- **Domain Diversity:** {analysis_results.get('diversity_metrics', {}).get('domain_diversity', 0):.1%}",
-            ""
-        ])
-        
+        diversity_metrics = analysis_results.get("diversity_metrics", {})
         red_flags = analysis_results.get("red_flags", [])
-        if red_flags:
-            report_lines.extend([
-                "### Red Flags",
-                ""
-            ])
-            for flag in red_flags:
-                report_lines.append(
-                    f"- **[{flag.get('severity', 'unknown').upper()}]** {flag.get('message', '')}"
-                )
-            report_lines.append("")
-        
         recommendations = analysis_results.get("recommendations", [])
-        if recommendations:
-            report_lines.extend([
-                "### Recommendations",
-                ""
-            ])
-            for i, rec in enumerate(recommendations, 1):
-                report_lines.append(f"{i}. {rec}")
-            report_lines.append("")
-        
-        if citation_suggestions:
-            report_lines.extend([
-                "---",
-                "",
-                "## Recommended Citations",
-                "",
-                f"The following {len(citation_suggestions)} citations are recommended to improve diversity and reliability:",
-                ""
-            ])
-            for i, cit in enumerate(citation_suggestions, 1):
-                report_lines.extend([
-                    f"### {i}. {cit.get('title', cit.get('url', 'Unknown'))}",
-                    "",
-                    f"- **URL:** {cit.get('url', 'N/A')}",
-                    f"- **Source Type:** {cit.get('source_type', 'unknown')}",
-                    f"- **Reliability:** {cit.get('reliability', 0):.1%}",
-                    f"- **Reason:** {cit.get('reason', 'Improves citation diversity')}",
-                    ""
-                ])
-        
-        if rewrites:
-            report_lines.extend([
-                "---",
-                "",
-                "## Recommended Rewrites",
-                ""
-            ])
-            for i, rewrite in enumerate(rewrites, 1):
-                report_lines.extend([
-                    f"### Rewrite {i}",
-                    "",
-                    "**Original:**",
-                    "",
-                    f"> {rewrite.get('original', '')}",
-                    "",
-                    "**Rewritten:**",
-                    "",
-                    f"> {rewrite.get('rewritten', '')}",
-                    "",
-                    f"**Explanation:** {rewrite.get('explanation', '')}",
-                    ""
-                ])
-        
-        report_lines.extend([
-            "---",
-            "",
-            "## Next Steps",
-            "",
-            "1. Review the recommended citations and verify their relevance",
-            "2. Add the suggested citations to the article",
-            "3. Consider applying the recommended rewrites for improved neutrality",
-            "4. Submit the edits through the GrokiPedia submission portal",
-            ""
-        ])
         
         output_path = self.output_dir / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(report_lines))
+        # Stream each section straight into the file buffer instead of joining a list of lines
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+            w = f.write
+            w(
+                "# Citation Graph Audit Report\n"
+                "\n"
+                f"**Article:** {article_data.get('title', 'Unknown')}\n"
+                f"**URL:** {article_data.get('url', 'N/A')}\n"
+                f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                "\n"
+                "---\n"
+                "\n"
+                "## Executive Summary\n"
+                "\n"
+                f"{explanation}\n"
+                "\n"
+                "---\n"
+                "\n"
+                "## Analysis Results\n"
+                "\n"
+                "### Quality Scores\n"
+                "\n"
+                f"- **Overall Quality:** {quality_scores.get('overall_quality', 0):.1%}\n"
+                f"- **Source Reliability:** {quality_scores.get('source_reliability', 0):.1%}\n"
+                f"- **Diversity Score:** {quality_scores.get('diversity_score', 0):.1%}\n"
+                f"- **Citation Count Score:** {quality_scores.get('citation_count_score', 0):.1%}\n"
+                "\n"
+                "### Bias & Diversity Metrics\n"
+                "\n"
+                f"- **Source Concentration:** {bias_metrics.get('source_concentration', 0):.1%}\n"
+                f"- **Single Cluster Risk:** {bias_metrics.get('single_cluster_risk', 0):.1%}\n"
+                f"- **Top Domain:** {bias_metrics.get('top_domain', 'N/A')}\n"
+                f"- **Domain Diversity:** {diversity_metrics.get('domain_diversity', 0):.1%}\n"
+                "\n"
+            )
+            
+            if red_flags:
+                w("### Red Flags\n\n")
+                for flag in red_flags:
+                    w(f"- **[{flag.get('severity', 'unknown').upper()}]** {flag.get('message', '')}\n")
+                w("\n")
+            
+            if recommendations:
+                w("### Recommendations\n\n")
+                for i, rec in enumerate(recommendations, 1):
+                    w(f"{i}. {rec}\n")
+                w("\n")
+            
+            if citations:
+                w(
+                    "---\n"
+                    "\n"
+                    "## Recommended Citations\n"
+                    "\n"
+                    f"The following {len(citations)} citations are recommended to improve diversity and reliability:\n"
+                    "\n"
+                )
+                for i, cit in enumerate(citations, 1):
+                    w(
+                        f"### {i}. {cit.title}\n"
+                        "\n"
+                        f"- **URL:** {cit.url}\n"
+                        f"- **Source Type:** {cit.source_type}\n"
+                        f"- **Reliability:** {cit.reliability:.1%}\n"
+                        f"- **Reason:** {cit.report_reason}\n"
+                        "\n"
+                    )
+            
+            if rewrite_entries:
+                w(
+                    "---\n"
+                    "\n"
+                    "## Recommended Rewrites\n"
+                    "\n"
+                )
+                for i, rewrite in enumerate(rewrite_entries, 1):
+                    w(
+                        f"### Rewrite {i}\n"
+                        "\n"
+                        "**Original:**\n"
+                        "\n"
+                        f"> {rewrite.original}\n"
+                        "\n"
+                        "**Rewritten:**\n"
+                        "\n"
+                        f"> {rewrite.rewritten}\n"
+                        "\n"
+                        f"**Explanation:** {rewrite.explanation}\n"
+                        "\n"
+                    )
+            
+            w(
+                "---\n"
+                "\n"
+                "## Next Steps\n"
+                "\n"
+                "1. Review the recommended citations and verify their relevance\n"
+                "2. Add the suggested citations to the article\n"
+                "3. Consider applying the recommended rewrites for improved neutrality\n"
+                "4. Submit the edits through the GrokiPedia submission portal\n"
+            )
         
         return output_path
     
@@ -197,112 +245,139 @@ class OutputGenerator:
         self,
         graph,
         article_data: Dict,
-        filename: str = "citation_graph.html"
+        filename: str = "citation_graph.html",
+        pos: Optional[Dict] = None
     ) -> Optional[Path]:
-        """Generate interactive graph visualization"""
+        """Generate interactive graph visualization, reusing `pos` when a layout is supplied"""
         if not PLOTLY_AVAILABLE or not config.ENABLE_VISUALIZATION:
             return None
         
-        try:
-            import networkx as nx
-            
-            # Prepare node positions
-            pos = nx.spring_layout(graph, k=1, iterations=50)
-            
-            # Separate nodes by type
-            article_nodes = [
-                n for n in graph.nodes()
-                if graph.nodes[n].get("node_type") == "article"
-            ]
-            source_nodes = [
-                n for n in graph.nodes()
-                if graph.nodes[n].get("node_type") == "source"
-            ]
-            
-            # Create edge traces
-            edge_x = []
-            edge_y = []
-            for edge in graph.edges():
-                x0, y0 = pos[edge[0]]
-                x1, y1 = pos[edge[1]]
-                edge_x.extend([x0, x1, None])
-                edge_y.extend([y0, y1, None])
-            
-            edge_trace = go.Scatter(
-                x=edge_x, y=edge_y,
-                line=dict(width=0.5, color='#888'),
-                hoverinfo='none',
-                mode='lines'
+        title = f"Citation Graph: {article_data.get('title', 'Article')}"
+        
+        # Keep the article node and the most reliable sources when the graph is too big to plot
+        total_nodes = graph.number_of_nodes()
+        if total_nodes > config.MAX_VIZ_NODES:
+            title += f" (top {config.MAX_VIZ_NODES} of {total_nodes} nodes by reliability)"
+            kept = sorted(
+                graph.nodes,
+                key=lambda n: (
+                    graph.nodes[n].get("node_type") != "article",
+                    -graph.nodes[n].get("reliability", 0)
+                )
+            )[:config.MAX_VIZ_NODES]
+            graph = graph.subgraph(kept).copy()
+            if pos is not None:
+                pos = {n: pos[n] for n in kept}
+        
+        # Prepare node positions (seeded so repeat runs draw the same layout)
+        if pos is None:
+            if graph.number_of_nodes() > SPECTRAL_LAYOUT_MIN_NODES:
+                pos = nx.spectral_layout(graph)
+            else:
+                pos = nx.spring_layout(graph, k=1, iterations=50, seed=42)
+        
+        # Copy the layout into a (V, 2) array once; every trace below indexes into it by position
+        node_index = {node: i for i, node in enumerate(graph.nodes())}
+        node_pos = np.array([pos[node] for node in node_index], dtype=float).reshape(-1, 2)
+        
+        # Separate nodes by type, keeping each node's row index and attribute dict
+        article_idx, article_attrs = [], []
+        source_idx, source_attrs = [], []
+        for i, (node, attrs) in enumerate(graph.nodes(data=True)):
+            node_type = attrs.get("node_type")
+            if node_type == "article":
+                article_idx.append(i)
+                article_attrs.append(attrs)
+            elif node_type == "source":
+                source_idx.append(i)
+                source_attrs.append(attrs)
+        
+        # Create edge traces: one (start, end, NaN gap) triple per edge
+        endpoints = np.fromiter(
+            (node_index[node] for edge in graph.edges() for node in edge),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        segments = np.full((len(endpoints), 3, 2), np.nan)
+        segments[:, 0] = node_pos[endpoints[:, 0]]
+        segments[:, 1] = node_pos[endpoints[:, 1]]
+        edge_x = segments[:, :, 0].ravel().tolist()
+        edge_y = segments[:, :, 1].ravel().tolist()
+        
+        edge_trace = go.Scatter(
+            x=edge_x, y=edge_y,
+            line=dict(width=0.5, color='#888'),
+            hoverinfo='none',
+            mode='lines'
+        )
+        
+        # Create source node traces in one pass over the source attributes
+        source_xy = node_pos[source_idx]
+        source_text, source_color = [], []
+        for attrs in source_attrs:
+            source_text.append(
+                f"{attrs.get('domain', 'unknown')}<br>"
+                f"Type: {attrs.get('source_type', 'other')}<br>"
+                f"Reliability: {attrs.get('reliability', 0):.2f}"
             )
-            
-            # Create source node traces
-            source_x = [pos[node][0] for node in source_nodes]
-            source_y = [pos[node][1] for node in source_nodes]
-            source_text = [
-                f"{graph.nodes[node].get('domain', 'unknown')}<br>"
-                f"Type: {graph.nodes[node].get('source_type', 'other')}<br>"
-                f"Reliability: {graph.nodes[node].get('reliability', 0):.2f}"
-                for node in source_nodes
+            source_color.append(attrs.get('reliability', 0.5))
+        
+        source_trace = go.Scatter(
+            x=source_xy[:, 0].tolist(), y=source_xy[:, 1].tolist(),
+            mode='markers',
+            hoverinfo='text',
+            text=source_text,
+            marker=dict(
+                size=10,
+                color=source_color,
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Reliability")
+            ),
+            name='Sources'
+        )
+        
+        # Create article node trace
+        if article_idx:
+            article_xy = node_pos[article_idx]
+            article_text = [
+                f"{attrs.get('title', 'Article')}<br>"
+                f"Citations: {attrs.get('citation_count', 0)}"
+                for attrs in article_attrs
             ]
             
-            source_trace = go.Scatter(
-                x=source_x, y=source_y,
+            article_trace = go.Scatter(
+                x=article_xy[:, 0].tolist(), y=article_xy[:, 1].tolist(),
                 mode='markers',
                 hoverinfo='text',
-                text=source_text,
+                text=article_text,
                 marker=dict(
-                    size=10,
-                    color=[graph.nodes[node].get('reliability', 0.5) for node in source_nodes],
-                    colorscale='Viridis',
-                    showscale=True,
-                    colorbar=dict(title="Reliability")
+                    size=20,
+                    color='red',
+                    symbol='star'
                 ),
-                name='Sources'
+                name='Article'
             )
-            
-            # Create article node trace
-            if article_nodes:
-                article_x = [pos[node][0] for node in article_nodes]
-                article_y = [pos[node][1] for node in article_nodes]
-                article_text = [
-                    f"{graph.nodes[node].get('title', 'Article')}<br>"
-                    f"Citations: {graph.nodes[node].get('citation_count', 0)}"
-                    for node in article_nodes
-                ]
-                
-                article_trace = go.Scatter(
-                    x=article_x, y=article_y,
-                    mode='markers',
-                    hoverinfo='text',
-                    text=article_text,
-                    marker=dict(
-                        size=20,
-                        color='red',
-                        symbol='star'
-                    ),
-                    name='Article'
-                )
-            
-            # Create figure
-            fig = go.Figure(
-                data=[edge_trace, source_trace] + ([article_trace] if article_nodes else []),
-                layout=go.Layout(
-                    title=f"Citation Graph: {article_data.get('title', 'Article')}",
-                    showlegend=True,
-                    hovermode='closest',
-                    margin=dict(b=20, l=5, r=5, t=40),
-                    xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-                )
+        
+        # Create figure
+        fig = go.Figure(
+            data=[edge_trace, source_trace] + ([article_trace] if article_idx else []),
+            layout=go.Layout(
+                title=title,
+                showlegend=True,
+                hovermode='closest',
+                margin=dict(b=20, l=5, r=5, t=40),
+                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
             )
-            
-            output_path = self.output_dir / filename
+        )
+        
+        output_path = self.output_dir / filename
+        try:
             fig.write_html(str(output_path))
-            return output_path
-            
-        except Exception as e:
-            print(f"Error generating visualization: {e}")
+        except OSError as e:
+            print(f"Error writing visualization: {e}")
             return None
+        return output_path
     
     def _generate_edit_instructions(
         self,
@@ -310,23 +385,26 @@ class OutputGenerator:
         rewrites: List[Dict]
     ) -> str:
         """Generate human-readable edit instructions"""
-        instructions = []
+        citations = self._normalize_citations(citation_suggestions)
+        sections = []
         
-        if citation_suggestions:
-            instructions.append(f"Add {len(citation_suggestions)} new citations:")
-            for i, cit in enumerate(citation_suggestions, 1):
-                instructions.append(
-                    f"  {i}. Add citation to: {cit.get('url', 'N/A')} "
-                    f"({cit.get('reason', 'Improves diversity')})"
-                )
+        if citations:
+            sections.append(
+                f"Add {len(citations)} new citations:\n" + "\n".join([
+                    f"  {i}. Add citation to: {cit.url} "
+                    f"({cit.instruction_reason})"
+                    for i, cit in enumerate(citations, 1)
+                ])
+            )
         
         if rewrites:
-            instructions.append(f"\nApply {len(rewrites)} paragraph rewrites:")
-            for i, rewrite in enumerate(rewrites, 1):
-                instructions.append(
+            sections.append(
+                f"\nApply {len(rewrites)} paragraph rewrites:\n" + "\n".join([
                     f"  {i}. Replace paragraph with rewritten version "
                     f"(see 'recommended_rewrites' section)"
-                )
+                    for i in range(1, len(rewrites) + 1)
+                ])
+            )
         
-        return "\n".join(instructions)
+        return "\n".join(sections)
 
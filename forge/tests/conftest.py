@@ -0,0 +1,5 @@
+"""Put the flat forge modules on the import path for the tests"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,21 @@
+"""Tests for Grokipedia markdown cleanup and citation extraction"""
+from grokipedia_crawler import parse_grokipedia_article
+
+
+def _page(markdown: str) -> str:
+    """Wrap article markdown in the RSC push script Grokipedia serves"""
+    return '<script>self.__next_f.push([1,"' + markdown + '"])</script>'
+
+
+def test_link_around_empty_reference_link_is_cited():
+    """Removing an embedded [](url) exposes the surrounding external link"""
+    article = parse_grokipedia_article(
+        _page("# T\\n[a [](https://q.com) b](https://r.com)"),
+        "https://grokipedia.com/page/T"
+    )
+    
+    assert article["content"] == "# T\n[a  b](https://r.com)"
+    assert article["citations"] == [
+        {"text": "a  b", "url": "https://r.com", "type": "markdown"}
+    ]
+    assert article["citation_count"] == 1
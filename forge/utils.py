@@ -1,11 +1,47 @@
 """Utility functions for Citation Graph Auditor"""
 import re
 import tldextract
-from typing import Dict, List, Optional, Tuple
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 import config
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
 
+# Markdown links, HTML anchors and bare URLs in one alternation, tried in that order
+# at each position so a URL inside a link is consumed before the bare branch sees it.
+# google-re2 scans it in linear time when installed; stdlib re is the fallback.
+_CITE_RE = (re2 if RE2_AVAILABLE else re).compile(
+    r'\[(?P<md_text>[^\]]+)\]\((?P<md_url>[^\)]+)\)'
+    r'|(?i:<a[^>]+href=["\'](?P<html_url>[^"\']+)["\'][^>]*>(?P<html_text>[^<]+)</a>)'
+    r'|(?P<bare>https?://[^\s<>"\'\)\[\]]+)'
+)
+_HTTP_PREFIXES = ('http://', 'https://')
+_TRAILING_PUNCT = '.,;:!?)'
 
+# Free hosting platforms whose sources get a reliability penalty
+_SUSPICIOUS_RE = re.compile(r'blogspot|wordpress|tumblr|wix')
+
+
+@dataclass
+class Citation:
+    """A cited source, enriched with classification metadata"""
+    __slots__ = ("url", "text", "type", "source_type", "domain", "reliability")
+    
+    url: str
+    text: str
+    type: str
+    source_type: str
+    domain: str
+    reliability: float
+
+
+@lru_cache(maxsize=4096)
 def extract_domain(url: str) -> str:
     """Extract domain from URL"""
     try:
@@ -16,10 +52,32 @@ def extract_domain(url: str) -> str:
         return url.lower()
 
 
+@lru_cache(maxsize=4096)
+def _tldextract_domain(domain: str):
+    """Split a domain into subdomain/domain/suffix, shared by the classifiers"""
+    return tldextract.extract(domain)
+
+
+@lru_cache(maxsize=None)
+def _category_patterns() -> List[Tuple[str, re.Pattern]]:
+    """One keyword alternation per source category, compiled from config on first use"""
+    # Config order is kept so the first matching category still wins
+    return [
+        (category, re.compile('|'.join(map(re.escape, keywords))))
+        for category, keywords in config.SOURCE_CATEGORIES.items()
+        if category != "other" and keywords
+    ]
+
+
 def classify_source_type(url: str) -> str:
     """Classify source type based on URL patterns"""
-    domain = extract_domain(url)
-    ext = tldextract.extract(domain)
+    return _classify_domain(extract_domain(url))
+
+
+@lru_cache(maxsize=4096)
+def _classify_domain(domain: str) -> str:
+    """Classify a source type from its domain; cached so citations sharing a domain classify once"""
+    ext = _tldextract_domain(domain)
     
     # Check TLD first
     if ext.suffix in ["edu", "ac.uk", "edu.au"]:
@@ -31,99 +89,98 @@ def classify_source_type(url: str) -> str:
     
     # Check domain patterns
     domain_lower = domain.lower()
-    for category, keywords in config.SOURCE_CATEGORIES.items():
-        if category == "other":
-            continue
-        for keyword in keywords:
-            if keyword in domain_lower:
-                return category
+    for category, keywords_re in _category_patterns():
+        if keywords_re.search(domain_lower):
+            return category
     
     return "other"
 
 
 def calculate_reliability_score(url: str, source_type: str) -> float:
     """Calculate reliability score for a source"""
+    return _domain_reliability(extract_domain(url), source_type)
+
+
+@lru_cache(maxsize=4096)
+def _domain_reliability(domain: str, source_type: str) -> float:
+    """Reliability score for a domain and source type, cached per registrable host"""
     base_score = config.RELIABILITY_SCORES.get(source_type, 0.5)
     
     # Boost for trusted domains
-    ext = tldextract.extract(extract_domain(url))
+    ext = _tldextract_domain(domain)
     if ext.suffix in config.TRUSTED_DOMAINS:
         base_score += 0.1
     
     # Penalize suspicious patterns
-    domain = extract_domain(url).lower()
-    suspicious = ["blogspot", "wordpress", "tumblr", "wix"]
-    if any(s in domain for s in suspicious):
+    if _SUSPICIOUS_RE.search(domain.lower()):
         base_score -= 0.2
     
     return max(0.0, min(1.0, base_score))
 
 
-def extract_citations_from_text(text: str) -> List[Dict]:
-    """Extract citation URLs and metadata from article text (optimized single-pass)"""
-    citations = []
-    seen_urls = set()  # Track seen URLs to avoid duplicates
+def _scan_citation_links(text: str, markdown: List, html: List, bare: List) -> None:
+    """Bucket every link in text by kind, including links nested in another link's text"""
+    for match in _CITE_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "md_url":
+            link_text = match.group("md_text")
+            url = match.group("md_url").strip()
+            if url.startswith(_HTTP_PREFIXES):
+                markdown.append((link_text, url.rstrip(_TRAILING_PUNCT)))
+        elif kind == "html_text":
+            link_text = match.group("html_text")
+            url = match.group("html_url").strip()
+            if url.startswith(_HTTP_PREFIXES):
+                html.append((link_text.strip(), url.rstrip(_TRAILING_PUNCT)))
+        else:
+            url = match.group("bare").rstrip(_TRAILING_PUNCT)
+            bare.append((url, url))
+            continue
+        # The alternation consumes a link whole; scan its text for links nested inside it
+        if "http" in link_text:
+            _scan_citation_links(link_text, markdown, html, bare)
+
+
+def iter_citations_from_text(text: str) -> Iterator[Dict]:
+    """Scan the whole text for links first, then yield deduplicated citation records (markdown, HTML, bare)"""
+    # Every pattern below only keeps http(s) URLs; one substring scan rules them all out
+    if "http" not in text:
+        return
+    
+    # One scan buckets every match by kind; markdown, then HTML, then bare URLs
+    # keep their precedence for ordering and duplicate resolution
+    markdown, html, bare = [], [], []
+    _scan_citation_links(text, markdown, html, bare)
     
-    # Combined pattern to match all citation types in a single pass
-    # Order matters: markdown first, then HTML, then bare URLs
-    # Using a more efficient approach: find all potential URLs first, then classify
-    
-    # First pass: Extract markdown links [text](url)
-    markdown_pattern = r'\[([^\]]+)\]\(([^\)]+)\)'
-    for match in re.finditer(markdown_pattern, text):
-        url = match.group(2).strip()
-        if url.startswith(('http://', 'https://')):
-            normalized_url = url.rstrip('.,;:!?)')
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                citations.append({
-                    "text": match.group(1),
-                    "url": normalized_url,
-                    "type": "markdown"
-                })
-    
-    # Second pass: Extract HTML links <a href="url">text</a>
-    html_pattern = r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>([^<]+)</a>'
-    for match in re.finditer(html_pattern, text, re.IGNORECASE):
-        url = match.group(1).strip()
-        if url.startswith(('http://', 'https://')):
-            normalized_url = url.rstrip('.,;:!?)')
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                citations.append({
-                    "text": match.group(2).strip(),
-                    "url": normalized_url,
-                    "type": "html"
-                })
-    
-    # Third pass: Extract bare URLs (only if not already found)
-    # Use a more precise pattern that avoids matching URLs already in markdown/HTML
-    url_pattern = r'https?://[^\s<>"\'\)\[\]]+'
-    for match in re.finditer(url_pattern, text):
-        url = match.group(0).rstrip('.,;:!?)')
-        # Check if this URL is not part of a markdown or HTML link
-        start_pos = match.start()
-        end_pos = match.end()
-        # Simple heuristic: if there's a ]( or <a before this URL, skip it
-        context_before = text[max(0, start_pos-10):start_pos]
-        if '](' not in context_before and '<a' not in context_before.lower():
+    seen_urls = set()  # Track seen URLs to avoid duplicates
+    for link_type, links in (("markdown", markdown), ("html", html), ("bare", bare)):
+        for link_text, url in links:
             if url not in seen_urls:
                 seen_urls.add(url)
-                citations.append({
-                    "text": url,
+                yield {
+                    "text": link_text,
                     "url": url,
-                    "type": "bare"
-                })
-    
-    return citations
+                    "type": link_type
+                }
+
+
+def extract_citations_from_text(text: str) -> List[Dict]:
+    """Extract citation URLs and metadata from article text as a list"""
+    return list(iter_citations_from_text(text))
 
 
 def normalize_domain(url: str) -> str:
     """Normalize domain for grouping"""
-    ext = tldextract.extract(extract_domain(url))
+    return _registrable_domain(extract_domain(url))
+
+
+@lru_cache(maxsize=4096)
+def _registrable_domain(domain: str) -> str:
+    """Collapse a host to domain.suffix, falling back to the host itself"""
+    ext = _tldextract_domain(domain)
     if ext.domain and ext.suffix:
         return f"{ext.domain}.{ext.suffix}"
-    return extract_domain(url)
+    return domain
 
 
 def calculate_diversity_score(domains: List[str]) -> float:
@@ -131,10 +188,7 @@ def calculate_diversity_score(domains: List[str]) -> float:
     if not domains:
         return 0.0
     
-    domain_counts = {}
-    for domain in domains:
-        normalized = normalize_domain(domain)
-        domain_counts[normalized] = domain_counts.get(normalized, 0) + 1
+    domain_counts = Counter(map(normalize_domain, domains))
     
     total = len(domains)
     unique = len(domain_counts)
@@ -151,15 +205,15 @@ def calculate_diversity_score(domains: List[str]) -> float:
     return diversity
 
 
-def format_citation_summary(citations: List[Dict]) -> str:
-    """Format citation list for display"""
+def format_citation_summary(citations: List[Citation]) -> str:
+    """Format a list of Citation records for display"""
     if not citations:
         return "No citations found"
     
     summary = f"Found {len(citations)} citations:\n"
     for i, cit in enumerate(citations[:10], 1):  # Show first 10
-        domain = normalize_domain(cit["url"])
-        source_type = classify_source_type(cit["url"])
+        domain = normalize_domain(cit.url)
+        source_type = classify_source_type(cit.url)
         summary += f"  {i}. [{source_type}] {domain}\n"
     
     if len(citations) > 10: